@@ -5,76 +5,134 @@ PyNVEL command line application
 import os
 import sys
 import json
+import functools
+from operator import itemgetter
 
 import click
+import numpy as np
 
 import pynvel
 
 def warn(x): print(x)
 
+# Species abbreviation to FIA species number
+_abbv_to_code = {v: k for k, v in pynvel.fia_spp.items()}
+
+# Log detail columns, keys are pynvel.log_dtype names in report order
+_LOG_KEYS = ('position', 'prod_class', 'bole_height', 'length'
+        , 'large_dob', 'large_dib', 'small_dob', 'small_dib'
+        , 'scale_diam', 'cuft_gross', 'bdft_gross', 'intl_gross')
+_LOG_FLDS = ('Bole', 'Len', 'L DOB', 'L DIB', 'S DOB', 'S DIB', 'Scale'
+        , 'CuFt', 'BdFt', 'Int 1/4')
+_LOG_FMT = '{:<3d} {:<4d} ' + ' '.join(['{:<7.1f}'] * len(_LOG_FLDS))
+_LOG_HEADER = 'Log Prod ' + ' '.join(f'{f:<7s}' for f in _LOG_FLDS)
+
+def _run_batch(dbh, ht, form, eq_ids, vol_eqs, mrule):
+    """
+    Return the volume attributes of a batch of trees.
+
+    Trees are sorted by equation and each equation is estimated with a
+    single call to VolumeCalculator.calc_array.
+
+    Args:
+        dbh (float64): Array of tree DBHs
+        ht (float64): Array of tree total heights
+        form (float64): Array of tree form class values
+        eq_ids (int): Array of indices into vol_eqs for each tree
+        vol_eqs (sequence): NVEL volume equation identifiers, e.g. the
+            uniques Index returned by pd.factorize
+        mrule (dict): Merchandizing rules, see pynvel.init_merchrule
+
+    Returns:
+        tuple: Array of tree volume attributes and the column labels
+    """
+    labels = list(pynvel.calc_array_labels)
+    vols = np.zeros((dbh.shape[0], len(labels)), dtype=np.float64)
+
+    # Rows of each equation are a contiguous slice of the sort order
+    order = np.argsort(eq_ids, kind='stable')
+    bounds = np.flatnonzero(np.diff(eq_ids[order])) + 1
+
+    for idx in np.split(order, bounds):
+        if idx.size == 0:
+            continue
+
+        vol_eq = vol_eqs[eq_ids[idx[0]]]
+
+        mr = mrule
+        if 'BEH' in vol_eq:
+            ml = float(vol_eq[1:3])
+            if ml != 0.0:
+                mr = dict(mrule, maxlen=ml)
+
+        volcalc = pynvel.VolumeCalculator(
+                volume_eq=vol_eq.encode()
+                , merch_rule=mr
+                , cruise_type=b'C'
+                )
+
+        vols[idx] = volcalc.calc_array(dbh[idx], ht[idx], form[idx])
+
+    return vols, labels
+
+@functools.lru_cache(maxsize=4096)
+def _cached_eq(spp, variant, region, forest, district, product=b'01', fia=False):
+    """Return pynvel.get_equation, memoized by species and location."""
+    return pynvel.get_equation(spp, variant, region, forest, district
+            , product, fia=fia)
+
 def print_report(volcalc, spp_abbv, spp_code, vol_eq, form_class):
     """Print a basic volume report to stdout."""
     r = volcalc.volume
 
-    print('Volume Report (Version: {})'.format(pynvel.version.vollib))
-    print('---------------------------------------')
-    print('Species: {}({})'.format(spp_abbv, spp_code))
-    print('Equation: {}'.format(vol_eq))
-    print('DBH:         {:>8.1f}'.format(volcalc.dbh_ob))
-    print('Form Class   {:>8.1f}'.format(form_class))
-    print('Form Ht:     {:>8.1f}'.format(volcalc.form_height))
-    print('Total Ht:    {:>8.1f}'.format(volcalc.total_height))
-    print('Merch Ht:    {:>8.1f}'.format(volcalc.merch_height))
-    print('CuFt Tot:    {:>8.1f}'.format(r['cuft_total']))
-    print('CuFt Merch:  {:>8.1f}'.format(r['cuft_gross_prim']))
-    print('BdFt Merch:  {:>8.1f}'.format(r['bdft_gross_prim']))
-    print('CuFt Top:    {:>8.1f}'.format(r['cuft_gross_sec']))
-    print('CuFt Stump:  {:>8.1f}'.format(r['cuft_stump']))
-    print('CuFt Tip:    {:>8.1f}'.format(r['cuft_tip']))
+    lines = [
+        f'Volume Report (Version: {pynvel.version.vollib})'
+        , '---------------------------------------'
+        , f'Species: {spp_abbv}({spp_code})'
+        , f'Equation: {vol_eq}'
+        , f'DBH:         {volcalc.dbh_ob:>8.1f}'
+        , f'Form Class   {form_class:>8.1f}'
+        , f'Form Ht:     {volcalc.form_height:>8.1f}'
+        , f'Total Ht:    {volcalc.total_height:>8.1f}'
+        , f'Merch Ht:    {volcalc.merch_height:>8.1f}'
+        , f"CuFt Tot:    {r['cuft_total']:>8.1f}"
+        , f"CuFt Merch:  {r['cuft_gross_prim']:>8.1f}"
+        , f"BdFt Merch:  {r['bdft_gross_prim']:>8.1f}"
+        , f"CuFt Top:    {r['cuft_gross_sec']:>8.1f}"
+        , f"CuFt Stump:  {r['cuft_stump']:>8.1f}"
+        , f"CuFt Tip:    {r['cuft_tip']:>8.1f}"
+        , ''
+        ]
 
     prod = volcalc.products
-    print('')
-    if not prod == {}:
-        print('Product Summary')
-        print('---------------')
-        print('Prod Logs CuFt   BdFt    Len   Diam')
+    if prod:
+        lines.extend([
+            'Product Summary'
+            , '---------------'
+            , 'Prod Logs CuFt   BdFt    Len   Diam'
+            ])
+        get_vals = itemgetter('count', 'cuft', 'bdft', 'len', 'diam')
+        fmt_fn = '{:<4d} {:<4.0f} {:<6.1f} {:<7.1f} {:<5.1f} {:<6.1f} '.format
         for i in range(volcalc.num_products):
-            try:
-                p = prod['prod_{}'.format(i + 1)]
-                s = (
-                    '{:<4d} {count:<4d} {cuft:<6.1f} {bdft:<7.1f} '
-                    '{length:<5.1f} {diameter:<6.1f} '
-                    ).format(i, **p)
-                print(s)
+            lines.append(fmt_fn(i + 1, *get_vals(prod[f'prod{i + 1}'])))
 
-            except:
-                pass
-
-        print('')
+        lines.append('')
 
     else:
-        print('* No products')
+        lines.append('* No products')
 
     if volcalc.num_logs > 0:
-        print('Log Detail')
-        print('----------')
-        logs = volcalc.logs
-        flds = ['Bole', 'Len', 'L DOB', 'L DIB', 'S DOB', 'S DIB', 'Scale'
-                , 'CuFt', 'BdFt', 'Int 1/4']
-        fmt = (
-            '{position:<3d} {prod_class:<4d} {bole_height:<7.1f} {length:<7.1f} '
-            '{large_dib:<7.1f} {large_dib:<7.1f} '
-            '{small_dob:<7.1f} {small_dib:<7.1f} {scale_diam:<7.1f} '
-            '{cuft_gross:<7.1f} {bdft_gross:<7.1f} {intl_gross:<7.1f}'
-            )
-        print('Log Prod ' + ' '.join(['{:<7s}'.format(f) for f in flds]))
-        for l, log in enumerate(logs):
-            print(fmt.format(**log.as_dict()))
+        logs = volcalc.logs_soa
+        lines.extend(['Log Detail', '----------', _LOG_HEADER])
+        cols = [logs[k].tolist() for k in _LOG_KEYS]
+        lines.extend(map(_LOG_FMT.format, *cols))
 
     else:
-        print('* No log detail'.format(vol_eq))
+        lines.append('* No log detail')
 
-    print('\nERROR: {}'.format(volcalc.error_message))
+    lines.append(f'\nERROR: {volcalc.error_message}')
+
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 # Shared options
 # Ref: https://github.com/pallets/click/issues/108#issuecomment-194465429
@@ -123,7 +181,7 @@ def volume(ctx, species='', dbh=None, height=None, equation=None, form_class=80)
 # TODO: Add option to export in json format
 # TODO: Add option to iterate through a file, database table, etc.
 
-    cfg = pynvel.get_config()
+    cfg = pynvel.config
     # print(cfg)
     mrule = pynvel.init_merchrule(**cfg.get('pynvel').get('merch_rule'))
 
@@ -157,14 +215,14 @@ def volume(ctx, species='', dbh=None, height=None, equation=None, form_class=80)
 
     # Get a default eqution if none provided
     if not equation:
-        vol_eq = pynvel.get_equation(spp_code,
+        vol_eq = _cached_eq(spp_code,
                 cfg['variant'].encode(), cfg['region'],
                 cfg['forest'].encode(), cfg['district'].encode(),
                 cfg['product'].encode()
                 )
 
     elif equation.upper() == 'FIA':
-        vol_eq = pynvel.get_equation(spp_code, cfg['variant'].encode(),
+        vol_eq = _cached_eq(spp_code, cfg['variant'].encode(),
                 cfg['region'], cfg['forest'].encode(), cfg['district'].encode()
                 , fia=True)
 
@@ -227,7 +285,7 @@ def stem_diam(ctx, species='', dbh=None, height=None, equation=None
         # raise NotImplementedError('Total height estimation is not implemented.')
         raise click.BadParameter('Total height estimation is not implemented.')
 
-    cfg = pynvel.get_config()
+    cfg = pynvel.config
 
     # Convert the species code
     try:
@@ -239,14 +297,14 @@ def stem_diam(ctx, species='', dbh=None, height=None, equation=None
 
     # Get a default eqution if none provided
     if not equation:
-        vol_eq = pynvel.get_equation(spp_code,
+        vol_eq = _cached_eq(spp_code,
                 cfg['variant'].encode(), cfg['region'],
                 cfg['forest'].encode(), cfg['district'].encode(),
                 cfg['product'].encode()
                 )
 
     elif equation.upper() == 'FIA':
-        vol_eq = pynvel.get_equation(spp_code, cfg['variant'].encode(),
+        vol_eq = _cached_eq(spp_code, cfg['variant'].encode(),
                 cfg['region'], cfg['forest'].encode(), cfg['district'].encode()
                 , fia=True)
 
@@ -282,7 +340,7 @@ def stem_height(ctx, species='', dbh=None, height=None, equation=None
         # raise NotImplementedError('Total height estimation is not implemented.')
         raise click.BadParameter('Total height estimation is not implemented.')
 
-    cfg = pynvel.get_config()
+    cfg = pynvel.config
 
     # Convert the species code
     try:
@@ -294,14 +352,14 @@ def stem_height(ctx, species='', dbh=None, height=None, equation=None
 
     # Get a default eqution if none provided
     if not equation:
-        vol_eq = pynvel.get_equation(spp_code,
+        vol_eq = _cached_eq(spp_code,
                 cfg['variant'].encode(), cfg['region'],
                 cfg['forest'].encode(), cfg['district'].encode(),
                 cfg['product'].encode()
                 )
 
     elif equation.upper() == 'FIA':
-        vol_eq = pynvel.get_equation(spp_code, cfg['variant'].encode(),
+        vol_eq = _cached_eq(spp_code, cfg['variant'].encode(),
                 cfg['region'], cfg['forest'].encode(), cfg['district'].encode()
                 , fia=True)
 
@@ -329,15 +387,106 @@ def run_tests():
 @click.command(name='config')
 def print_config():
     'Print the contents of the configuration file and exit.'
-    print(json.dumps(pynvel.get_config(), indent=4, sort_keys=True))
+    print(json.dumps(pynvel.config, indent=4, sort_keys=True))
     sys.exit(0)
 
-# @click.command(name='treelist')
-# @click.option('-l', '--treelist', help='CSV file of trees')
-# def calc_table(treelist=None):
-    # 'Calculate volume for a treelist in a csv file.'
-    # print('Calculate table not implemented.')
-    # sys.exit(0)
+@click.command(name='treelist')
+@click.option('-i', '--input', 'treelist', type=click.File('r'), default='-'
+        , help=(
+                'CSV file of trees with columns species, dbh, height and '
+                'optionally form_class and equation. Defaults to stdin.')
+        )
+@click.option('-e', '--equation', type=str, default=None
+        , help=(
+                'NVEL volume equation identifier applied to trees without an '
+                'equation. Pass "FIA" to use the FIA default equations.')
+        )
+def calc_table(treelist=None, equation=None):
+    """
+    Calculate volume for a treelist in a csv file.
+
+    Trees are grouped by volume equation and each group is passed to a
+    single call of VolumeCalculator.calc_array.
+    """
+    try:
+        import pandas as pd
+    except ImportError:
+        raise click.UsageError('The treelist command requires pandas, '
+                'install it with "pip install pandas".')
+
+    cfg = pynvel.config['pynvel']
+    mrule = pynvel.init_merchrule(**cfg['merch_rule'])
+
+    # Read all columns as text so species codes are not parsed as numbers
+    trees = pd.read_csv(treelist, dtype=str)
+    trees.columns = [c.strip().lower() for c in trees.columns]
+    trees = trees.rename(columns={'total_ht':'height'})
+
+    missing_cols = [c for c in ('species', 'dbh', 'height') if c not in trees]
+    if missing_cols:
+        raise click.BadParameter(
+                'Treelist is missing required columns: {}'.format(
+                ', '.join(missing_cols)), param_hint='--input')
+
+    if 'form_class' not in trees:
+        trees['form_class'] = None
+
+    for c in ('dbh', 'height', 'form_class'):
+        trees[c] = pd.to_numeric(trees[c], errors='coerce')
+
+    trees['form_class'] = trees['form_class'].fillna(80)
+
+    if 'equation' not in trees:
+        trees['equation'] = None
+
+    if trees['dbh'].isnull().any():
+        raise click.BadParameter('Missing DBH.', param_hint='--input')
+
+    fia = bool(equation) and equation.upper() == 'FIA'
+    if equation and not fia:
+        trees['equation'] = trees['equation'].fillna(equation)
+
+    if trees['height'].isnull().any():
+        raise click.BadParameter('Total height estimation is not implemented.'
+                , param_hint='--input')
+
+    species = trees['species'].str.strip().str.upper()
+    if (species.isnull() | (species == '')).any():
+        raise click.BadParameter('Missing species.', param_hint='--input')
+
+    # Resolve species codes, FIA numbers are used as is
+    codes = species.where(species.str.isdigit(), species.map(_abbv_to_code))
+
+    # Fall back to spp_codes for abbreviations not in fia_spp, unknown
+    #   species are reported on stderr to keep the table output clean
+    for spp in species[codes.isnull()].unique():
+        try:
+            codes[species == spp] = pynvel.spp_codes[spp][0]
+        except KeyError:
+            click.echo('Species {} is not known.'.format(spp), err=True)
+            codes[species == spp] = 999
+
+    trees['spp_code'] = codes.astype(int)
+
+    # Resolve a default equation once per species
+    missing = trees['equation'].isnull()
+    for spp_code in trees.loc[missing, 'spp_code'].unique():
+        vol_eq = _cached_eq(int(spp_code), cfg['variant'].encode()
+                , cfg['region'], cfg['forest'].encode()
+                , cfg['district'].encode(), cfg['product'].encode(), fia=fia)
+        trees.loc[missing & (trees['spp_code'] == spp_code), 'equation'] = vol_eq
+
+    trees['equation'] = trees['equation'].str.upper()
+
+    eq_ids, vol_eqs = pd.factorize(trees['equation'])
+    vols, labels = _run_batch(
+            trees['dbh'].to_numpy(np.float64)
+            , trees['height'].to_numpy(np.float64)
+            , trees['form_class'].to_numpy(np.float64)
+            , eq_ids, vol_eqs, mrule)
+
+    trees = trees.join(pd.DataFrame(vols, index=trees.index, columns=labels))
+    print(trees.drop(columns='spp_code').to_string())
 
 # @click.command(name='install_arcgis')
 # def install_arcgis(args):
@@ -349,7 +498,7 @@ cli.add_command(volume)
 cli.add_command(stem_height)
 cli.add_command(run_tests)
 cli.add_command(print_config)
-#cli.add_command(calc_table)
+cli.add_command(calc_table)
 #cli.add_command(install_arcgis)
 
 if __name__ == '__main__':
@@ -310,6 +310,37 @@ cdef class Log:
 #     def __str__(self):
 #         return self.__repr__()
 
+# Column labels of the array returned by VolumeCalculator.calc_array
+calc_array_labels = (
+        'total_cuft','merch_cuft'
+        ,'merch_bdft','merch_ht'
+        ,'num_logs','err_flag')
+
+# Record layout of VolumeCalculator.logs_array and keys of logs_soa
+log_dtype = np.dtype([
+        ('position', np.int32)
+        , ('bole_height', np.float32)
+        , ('length', np.float32)
+        , ('large_dib', np.float32)
+        , ('large_dob', np.float32)
+        , ('small_dib', np.float32)
+        , ('small_dob', np.float32)
+        , ('scale_diam', np.float32)
+        , ('cuft_gross', np.float32)
+        , ('bdft_gross', np.float32)
+        , ('intl_gross', np.float32)
+        , ('prod_class', np.int32)
+        ])
+
+# Record layout of the array returned by VolumeCalculator.products_array
+product_dtype = np.dtype([
+        ('cuft', np.float32)
+        , ('bdft', np.float32)
+        , ('len', np.float32)
+        , ('count', np.int32)
+        , ('diam', np.float32)
+        ])
+
 cpdef float scribner_volume(float diam, float length, bint cor=True):
     """
     Return Scribner board foot volume computed using factors.
@@ -503,10 +534,7 @@ cdef class Cython_VolumeCalculator:
     property volume_labels:
         """List of labels for the array returned by calc_array"""
         def __get__(self):
-                return [
-                    'total_cuft','merch_cuft'
-                    ,'merch_bdft','merch_ht'
-                    ,'num_logs','err_flag']
+                return list(calc_array_labels)
 
     property total_height:
         """Return the total height of the tree."""
@@ -588,6 +616,25 @@ cdef class Cython_VolumeCalculator:
 
             return d
 
+    property products_array:
+        """Return a structured array of log product summaries, see product_dtype."""
+        def __get__(self):
+            cdef int i
+
+            if not self.calc_products:
+                return None
+
+            # Zero values are retained if no cuft volume
+            prods = np.zeros((self.num_products, ), dtype=product_dtype)
+            for i in range(self.num_products):
+                if self.log_prod_cuft[i]>0.0:
+                    prods[i] = (
+                            self.log_prod_cuft[i], self.log_prod_bdft[i]
+                            , self.log_prod_len[i], self.log_prod_count[i]
+                            , self.log_prod_diam[i])
+
+            return prods
+
     property log_vol:
         """Return a list of log segment volumes."""
         def __get__(self):
@@ -647,6 +694,49 @@ cdef class Cython_VolumeCalculator:
 
             return logs
 
+    property logs_soa:
+        """
+        Return a dict of log attribute arrays, keyed by the log_dtype names.
+
+        Array dtypes match log_dtype. Arrays are read-only views of the NVEL
+        work arrays where possible and are overwritten by the next call to
+        calc, copy them to keep the values.
+        """
+        def __get__(self):
+            cdef int n = self.num_logs
+
+            diam = np.asarray(self.log_diam_wk)
+            vol = np.asarray(self.log_vol_wk)
+
+            d = OrderedDict()
+            d['position'] = np.arange(1, n+1, dtype=np.int32)
+            d['bole_height'] = np.asarray(self.bole_ht_wk)[1:n+1]
+            d['length'] = np.asarray(self.log_len_wk)[:n]
+            d['large_dib'] = diam[:n, 1]
+            d['large_dob'] = diam[:n, 2]
+            d['small_dib'] = diam[1:n+1, 1]
+            d['small_dob'] = diam[1:n+1, 2]
+            d['scale_diam'] = diam[1:n+1, 0]
+            d['cuft_gross'] = vol[3, :n]
+            d['bdft_gross'] = vol[0, :n]
+            d['intl_gross'] = vol[6, :n]
+            d['prod_class'] = np.asarray(self.log_prod_wk)[:n].astype(np.int32)
+
+            # Prevent callers from writing into the work arrays
+            for v in d.values():
+                v.setflags(write=False)
+
+            return d
+
+    property logs_array:
+        """Return a structured array of log attributes, see log_dtype."""
+        def __get__(self):
+            logs = np.zeros((self.num_logs, ), dtype=log_dtype)
+            for k, v in self.logs_soa.items():
+                logs[k] = v
+
+            return logs
+
     property error_message:
         """Return the volume calculation error message."""
         def __get__(self):
@@ -679,6 +769,10 @@ cdef class Cython_VolumeCalculator:
         """
         Return an array of volume attributes for an array of trees.
 
+        Input arrays must be 1-D float64, other dtypes raise a ValueError.
+        Convert inputs once with np.asarray(x, dtype=np.float64); 1-D C and
+        F order are equivalent and strided views are read without a copy.
+
         Args:
             dbh (float64): Array of tree DBHs
             total_ht (float64): Array of tree heights
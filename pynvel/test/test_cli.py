@@ -0,0 +1,125 @@
+"""
+Test the command line treelist batch against single tree calculations.
+"""
+
+import io
+import unittest
+
+import numpy as np
+import pandas as pd
+from click.testing import CliRunner
+
+import pynvel
+from pynvel.__main__ import cli, _LOG_KEYS
+
+treelist = """\
+Species,DBH,Height,Form_Class,Equation
+DF,18.0,120.0,80,F01FW2W202
+202,24.0,150.0,,
+WH,14.0,95.0,78,
+263,30.0,160.0,80,616BEHW263
+DF,22.0,135.0,82,616BEHW202
+"""
+
+def _runner():
+    """Return a CliRunner that keeps stderr out of the table output."""
+    try:
+        return CliRunner(mix_stderr=False)
+    except TypeError:
+        # click>=8.2 always separates result.stdout and result.stderr
+        return CliRunner()
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Test setup, load the configured location and merch rule
+        """
+        self.cfg = pynvel.config['pynvel']
+        self.mrule = pynvel.init_merchrule(**self.cfg['merch_rule'])
+
+    def expected(self, row):
+        """Return the calc_array columns for a single tree using calc."""
+        spp_code = {'DF':202, 'WH':263}.get(row['species'], row['species'])
+        vol_eq = row['equation']
+        if pd.isnull(vol_eq):
+            vol_eq = pynvel.get_equation(int(spp_code)
+                    , self.cfg['variant'].encode(), self.cfg['region']
+                    , self.cfg['forest'].encode(), self.cfg['district'].encode()
+                    , self.cfg['product'].encode())
+
+        mrule = dict(self.mrule)
+        if 'BEH' in vol_eq and float(vol_eq[1:3]) != 0.0:
+            mrule['maxlen'] = float(vol_eq[1:3])
+
+        vc = pynvel.VolumeCalculator(volume_eq=vol_eq.encode()
+                , merch_rule=mrule, cruise_type=b'C')
+        err = vc.calc(dbh_ob=row['dbh'], total_ht=row['height']
+                , form_class=int(row['form_class']))
+
+        if err != 0:
+            return [0.0] * 6
+
+        v = vc.volume
+        return [v['cuft_total'], v['cuft_gross_prim'], v['bdft_gross_prim']
+                , vc.merch_height, float(vc.num_logs), 0.0]
+
+    def test_treelist(self):
+        """
+        Compare the treelist command output with VolumeCalculator.calc.
+        """
+        result = _runner().invoke(cli, ['treelist'], input=treelist)
+        self.assertEqual(result.exit_code, 0, result.output)
+
+        out = pd.read_csv(io.StringIO(result.stdout), sep=r'\s+')
+        self.assertEqual(len(out), 5)
+
+        trees = pd.read_csv(io.StringIO(treelist), dtype={'Species':str})
+        trees.columns = [c.lower() for c in trees.columns]
+        trees['form_class'] = trees['form_class'].fillna(80)
+
+        labels = list(pynvel.calc_array_labels)
+        for i, row in trees.iterrows():
+            np.testing.assert_allclose(
+                    out.loc[i, labels].to_numpy(np.float64)
+                    , self.expected(row), rtol=1e-4, atol=0.01)
+
+    def test_missing_column(self):
+        """
+        A treelist without a height column is rejected.
+        """
+        result = _runner().invoke(cli, ['treelist'], input='species,dbh\nDF,18\n')
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('height', result.stderr)
+
+    def test_blank_species(self):
+        """
+        A treelist with a blank species is rejected.
+        """
+        result = _runner().invoke(cli, ['treelist']
+                , input='species,dbh,height\nDF,18,120\n,20,130\n')
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('Missing species', result.stderr)
+
+    def test_unknown_species(self):
+        """
+        Unknown species are reported on stderr and estimated as species 999.
+        """
+        result = _runner().invoke(cli, ['treelist', '-e', 'F01FW2W202']
+                , input='species,dbh,height\nZZ,18,120\n')
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Species ZZ is not known', result.stderr)
+
+        # The table on stdout is not interrupted by the warning
+        out = pd.read_csv(io.StringIO(result.stdout), sep=r'\s+')
+        self.assertEqual(len(out), 1)
+        self.assertGreater(out.loc[0, 'total_cuft'], 0.0)
+
+    def test_log_keys(self):
+        """
+        The log detail report covers every pynvel.log_dtype field.
+        """
+        self.assertEqual(set(_LOG_KEYS), set(pynvel.log_dtype.names))
+
+if __name__ == "__main__":
+    unittest.main()
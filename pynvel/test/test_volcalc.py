@@ -1,26 +1,113 @@
-'''
-Created on Mar 5, 2016
+"""
+Test the VolumeCalculator tree and log attributes.
+
+Douglas-fir, Region 6, Siuslaw
+"""
 
-@author: THAREN
-'''
 import unittest
 
+import numpy as np
+import pandas as pd
+
+import pynvel
+
+# calc_array requires 1-D float64 inputs
+_F64 = dict(dtype=np.float64, order='C')
+
+def _mrule(maxlen):
+    """Return region 6 merchandizing rules for a maximum log length."""
+    return pynvel.init_merchrule(evod=2, opt=23, maxlen=maxlen
+            , minlen=2.0, minlent=2.0, merchl=8.0, mtopp=5.0, mtops=2.0
+            , trim=0.5, stump=0.0, cor='Y', minbfd=8.0)
+
+def _logs_df(vc):
+    """Return the log attributes of vc as a DataFrame."""
+    return pd.DataFrame(vc.logs_soa).round(1)
 
 class Test(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        """
+        Test setup, define the equation and merchandizing rules once
+        """
+        cls.vol_eq = 'F01FW2W202'
+        cls.mrule_40 = _mrule(40.0)
+        cls.mrule_16 = _mrule(16.0)
+
+    def test_loglen(self):
+        """
+        Compare log segmentation of the same tree using 40' and 16' logs.
+        """
+        vc = pynvel.VolumeCalculator(volume_eq=self.vol_eq
+                , merch_rule=self.mrule_40)
+        vc.calc(dbh_ob=24.0, total_ht=150.0)
+        cuft_40 = vc.volume['cuft_total']
+        logs_40 = _logs_df(vc)
+        assert len(logs_40) == vc.num_logs
+
+        # The structured array agrees with the Log objects
+        logs = pd.DataFrame.from_records([l.as_dict() for l in vc.logs]).round(1)
+        pd.testing.assert_frame_equal(
+                logs_40.astype('float64'), logs[logs_40.columns].astype('float64'))
+
+        # Recalculate the same tree with 16' logs
+        vc.merch_rule = self.mrule_16
+        vc.calc(dbh_ob=24.0, total_ht=150.0)
+        cuft_16 = vc.volume['cuft_total']
+        logs_16 = _logs_df(vc)
+
+        assert len(logs_16) == vc.num_logs
+        assert len(logs_16) > len(logs_40)
+
+        assert np.all(logs_40['length'] <= 40.0)
+        assert np.all(logs_16['length'] <= 16.0)
+
+        # Log segmentation does not change the tree total volume
+        self.assertLess(abs(cuft_40 - cuft_16), 0.1)
+
+    def test_products(self):
+        """
+        Summarize the logs of a tree by product class.
+        """
+        vc = pynvel.VolumeCalculator(volume_eq=self.vol_eq
+                , merch_rule=self.mrule_40, calc_products=True)
+        vc.calc(dbh_ob=24.0, total_ht=150.0)
+
+        prods = vc.products_array
+        index = [f'prod{i+1}' for i in range(vc.num_products)]
+        df = pd.DataFrame(prods, index=index).round(1)
 
-    def setUp(self):
-        pass
+        assert len(df) == vc.num_products
+        assert prods['count'].sum() == vc.num_logs
+        self.assertLess(
+                abs(prods['cuft'].sum() - vc.logs_array['cuft_gross'].sum()), 0.1)
+        self.assertLess(
+                abs(prods['bdft'].sum() - vc.logs_array['bdft_gross'].sum()), 0.1)
 
+        # The structured array agrees with the products dict
+        for p, row in vc.products.items():
+            for k, v in row.items():
+                self.assertLess(abs(df.loc[p, k] - round(v, 1)), 0.1)
 
-    def tearDown(self):
-        pass
+    def test_df(self):
+        """
+        Estimate a large batch of trees with a single call to calc_array.
+        """
+        n = 10000
+        rng = np.random.default_rng(0)
+        dbh = np.asarray(rng.uniform(6.0, 30.0, n), **_F64)
+        ht = np.asarray(dbh * 5.0 + 30.0, **_F64)
 
+        vc = pynvel.VolumeCalculator(volume_eq=self.vol_eq)
 
-    def testName(self):
-        pass
+        vol = vc.calc_array(dbh, ht)
+        df = pd.DataFrame(vol, columns=vc.volume_labels)
 
+        assert len(df) == n
+        assert vc.num_trees == n
+        assert np.all(df['total_cuft'] > 0)
+        assert np.all(df['merch_ht'] < ht)
 
 if __name__ == "__main__":
-    # import sys;sys.argv = ['', 'Test.testName']
     unittest.main()